@@ -0,0 +1,110 @@
+import numpy as np
+
+class Collision:
+    # Exact collision rule of visualise.pl (testCollision): a move collides with a cell if the
+    # segment between the two positions intersects one of the four edges of the unit square
+    # around the cell. Works on whole arrays of segments at once.
+    def __init__(self, track, chunk_size=4096):
+        self.track = track
+        self.rows, self.cols = len(track.grid), len(track.grid[0])
+        self.chunk_size = chunk_size
+
+    # Returns a bool array telling which segments starts[i] -> ends[i] hit a cell of the letter
+    def segments_collide(self, starts, ends, letter='O'):
+        starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.int64).reshape(-1, 2)
+        collide = np.zeros(len(starts), dtype=bool)
+
+        for begin in range(0, len(starts), self.chunk_size):
+            chunk = slice(begin, begin + self.chunk_size)
+            collide[chunk] = self.chunk_collide(starts[chunk], ends[chunk], letter)
+        return collide
+
+    def chunk_collide(self, starts, ends, letter):
+        if len(starts) == 0:
+            return np.zeros(0, dtype=bool)
+
+        # Only cells in the bounding box of a segment can touch it. The boxes are listed one after
+        # another, so the work grows with the sum of their areas, not with the largest one
+        low = np.minimum(starts, ends)
+        width = np.abs(ends[:, 1] - starts[:, 1]) + 1
+        area = (np.abs(ends[:, 0] - starts[:, 0]) + 1) * width
+        segment = np.repeat(np.arange(len(starts)), area)
+        offset = np.arange(len(segment)) - np.repeat(np.cumsum(area) - area, area)
+        cell_r = low[segment, 0] + offset // width[segment]
+        cell_c = low[segment, 1] + offset % width[segment]
+        inside = (cell_r >= 0) & (cell_r < self.rows) & (cell_c >= 0) & (cell_c < self.cols)
+        segment, cell_r, cell_c = segment[inside], cell_r[inside], cell_c[inside]
+        candidate = self.track.cells(cell_r, cell_c) == letter
+        segment, cell_r, cell_c = segment[candidate], cell_r[candidate], cell_c[candidate]
+
+        # Same coordinates and edge order as visualise.pl: x is the column, y counts rows from the bottom
+        c_x, c_y = starts[segment, 1], self.rows - 1 - starts[segment, 0]
+        d_x, d_y = ends[segment, 1], self.rows - 1 - ends[segment, 0]
+        center_x, center_y = cell_c, self.rows - 1 - cell_r
+        corners = [(-0.5, -0.5), (-0.5, 0.5), (0.5, 0.5), (0.5, -0.5)]
+
+        hit = np.zeros(len(segment), dtype=bool)
+        for k in range(4):
+            a_x, a_y = center_x + corners[k][0], center_y + corners[k][1]
+            b_x, b_y = center_x + corners[(k + 1) % 4][0], center_y + corners[(k + 1) % 4][1]
+            hit |= self.intersect_lines(a_x, a_y, b_x, b_y, c_x, c_y, d_x, d_y)
+
+        collide = np.zeros(len(starts), dtype=bool)
+        collide[segment[hit]] = True
+        return collide
+
+    # Vectorized intersectLines of visualise.pl, only returning whether the lines intersect
+    def intersect_lines(self, a_x, a_y, b_x, b_y, c_x, c_y, d_x, d_y):
+        d1 = (a_x - b_x) * (c_y - d_y)
+        d2 = (a_y - b_y) * (c_x - d_x)
+        dp = d1 - d2
+        dq = d2 - d1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = ((b_y - d_y) * (c_x - d_x) - (b_x - d_x) * (c_y - d_y)) / dp
+            q = ((d_y - b_y) * (a_x - b_x) - (d_x - b_x) * (a_y - b_y)) / dq
+        return (dp != 0) & (dq != 0) & (p > 0) & (p <= 1) & (q > 0) & (q <= 1)
+
+    # Validates trips with the rules of visualise.pl. Returns for every trip the indices of the
+    # wrong positions, an empty list means the trip is valid.
+    def validate_trips(self, trips):
+        lengths = np.array([len(trip) for trip in trips], dtype=np.int64)
+        if lengths.sum() == 0:
+            return [[] for _ in trips]
+        positions = np.concatenate([np.asarray(trip, dtype=np.int64).reshape(-1, 2) for trip in trips])
+        first = np.repeat(np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        index = np.arange(len(positions)) - first
+
+        previous = np.where(index[:, None] > 0, np.roll(positions, 1, axis=0), positions)
+        speed = positions - previous
+        previous_speed = np.where(index[:, None] > 1, np.roll(speed, 1, axis=0), 0)
+
+        on_track = ((positions[:, 0] >= 0) & (positions[:, 0] < self.rows) &
+                    (positions[:, 1] >= 0) & (positions[:, 1] < self.cols))
+        cells = np.full(len(positions), 'O')
+        cells[on_track] = self.track.cells(positions[on_track, 0], positions[on_track, 1])
+        previous_grass = np.where(index > 0, np.roll(~on_track | (cells == 'G'), 1), False)
+
+        wrong = index == 0
+        wrong &= cells != 'S'
+        wrong |= np.any(np.abs(positions - (previous + previous_speed)) > 1, axis=1)
+        wrong |= previous_grass & np.any((np.abs(previous_speed) > 1) & (np.abs(speed) >= np.abs(previous_speed)), axis=1)
+        wrong |= self.segments_collide(previous, positions, 'O')
+        finish = self.segments_collide(previous, positions, 'F')
+
+        results = []
+        for start, length in zip(np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths):
+            trip_finish = np.flatnonzero(finish[start:start + length])
+            if len(trip_finish):
+                end = trip_finish[0] + 1
+                trip_wrong = np.flatnonzero(wrong[start:start + end])
+            else:
+                trip_wrong = np.union1d(np.flatnonzero(wrong[start:start + length]), [length - 1])
+            results.append([int(i) for i in trip_wrong])
+        return results
+
+    def validate_trip(self, trip):
+        return self.validate_trips([trip])[0]
+
+    def is_valid_trip(self, trip):
+        return len(self.validate_trip(trip)) == 0
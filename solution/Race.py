@@ -1,10 +1,11 @@
 import tkinter as tk
 import matplotlib.pyplot as plt
 import numpy as np
+from TripFile import save_trip
 
 class Race:
     def __init__(self, racecar, track, name='Grand Prix',
-                 draw_last_possible_moves=1, draw_racecar_path=1, draw_distances=1, draw_indices=1, draw_best_path=1):
+                 draw_last_possible_moves=1, draw_racecar_path=1, draw_distances=1, draw_indices=1, draw_best_path=1, view_margin=None):
         self.name = name
         self.track = track
         self.racecar = racecar
@@ -15,11 +16,12 @@ class Race:
         self.draw_indices = draw_indices
         self.draw_best_path = draw_best_path
         self.cell_size = 15
+        self.view_margin = view_margin  # only draw cells this close to the car's path, for large maps
+        self.row_offset, self.col_offset = 0, 0
+        self.view_rows, self.view_cols = len(self.track.grid), len(self.track.grid[0])
 
     def save_trip(self, filename):
-        with open(filename, 'w') as file:
-            for i, j in self.translate_positions(self.racecar.pos_hist):
-                file.write(f"{i}, {j}\n")
+        save_trip(filename, self.racecar.pos_hist, len(self.track.grid))
 
     def translate_positions(self, pos_list):
         num_rows = len(self.track.grid)
@@ -32,6 +34,12 @@ class Race:
     def make_move_and_refresh(self, canvas):
         self.racecar.make_move()
 
+        # Follow the car: move the view to its new surroundings and resize the canvas to match
+        if self.view_margin is not None:
+            self.set_race_view()
+            canvas.delete('all')
+            canvas.config(width=(self.view_cols + 1) * self.cell_size, height=(self.view_rows + 1) * self.cell_size)
+
         if self.draw_indices:
             self.draw_indices_f(canvas)
 
@@ -44,11 +52,31 @@ class Race:
         if self.draw_last_possible_moves:
             self.draw_last_possible_moves_f(canvas)
 
+    # Restricts drawing to the bounding box of the given paths plus view_margin cells
+    def set_view(self, paths):
+        if self.view_margin is None:
+            return
+        positions = [pos for path in paths if path for pos in path]
+        rows = [x for x, _ in positions] or [0]
+        cols = [y for _, y in positions] or [0]
+        self.row_offset = max(0, min(rows) - self.view_margin)
+        self.col_offset = max(0, min(cols) - self.view_margin)
+        self.view_rows = min(len(self.track.grid), max(rows) + self.view_margin + 1) - self.row_offset
+        self.view_cols = min(len(self.track.grid[0]), max(cols) + self.view_margin + 1) - self.col_offset
+
+    # View around the car's current position, its planned path and its possible next moves
+    def set_race_view(self):
+        self.set_view([[self.racecar.pos], self.racecar.best_path,
+                       self.racecar.calculate_possible_pos(self.racecar.pos, self.racecar.inertia)])
+
+    def cell_center(self, pos):
+        return (pos[1] - self.col_offset + 1.5) * self.cell_size, (pos[0] - self.row_offset + 1.5) * self.cell_size
+
     def draw_indices_f(self, canvas):
-        for i in range(len(self.track.grid)):
-            canvas.create_text(self.cell_size // 2, (i + 1.5) * self.cell_size, text=str(i), anchor='e')
-        for j in range(len(self.track.grid[0])):
-            canvas.create_text((j + 1.5) * self.cell_size, self.cell_size // 2, text=str(j), anchor='s')
+        for i in range(self.view_rows):
+            canvas.create_text(self.cell_size // 2, (i + 1.5) * self.cell_size, text=str(i + self.row_offset), anchor='e')
+        for j in range(self.view_cols):
+            canvas.create_text((j + 1.5) * self.cell_size, self.cell_size // 2, text=str(j + self.col_offset), anchor='s')
 
     def draw_track(self, canvas):
         COLORS = {
@@ -58,10 +86,11 @@ class Race:
             'O': 'black',
             'G': 'green'
         }
-        for i, row in enumerate(self.track.grid):
-            for j, cell in enumerate(row):
+        for i in range(self.row_offset, self.row_offset + self.view_rows):
+            for j in range(self.col_offset, self.col_offset + self.view_cols):
+                cell = self.track.grid[i][j]
                 color = COLORS.get(cell, 'white')
-                x1, y1 = (j + 1) * self.cell_size, (i + 1) * self.cell_size
+                x1, y1 = (j - self.col_offset + 1) * self.cell_size, (i - self.row_offset + 1) * self.cell_size
                 x2, y2 = x1 + self.cell_size, y1 + self.cell_size
                 canvas.create_rectangle(x1, y1, x2, y2, fill=color)
                 if cell in 'SF':
@@ -73,41 +102,37 @@ class Race:
 
     def draw_racecar_path_f(self, canvas):
         for k, (x, y) in enumerate(self.racecar.pos_hist):
-            x_center = (y + 1.5) * self.cell_size
-            y_center = (x + 1.5) * self.cell_size
+            x_center, y_center = self.cell_center((x, y))
             canvas.create_oval(x_center - 5, y_center - 5, x_center + 5, y_center + 5, fill='red')
             canvas.create_text(x_center, y_center, text=str(k), fill='cyan')
 
             if k < len(self.racecar.pos_hist) - 1:
-                x_next_center = (self.racecar.pos_hist[k + 1][1] + 1.5) * self.cell_size
-                y_next_center = (self.racecar.pos_hist[k + 1][0] + 1.5) * self.cell_size
+                x_next_center, y_next_center = self.cell_center(self.racecar.pos_hist[k + 1])
                 canvas.create_line(x_center, y_center, x_next_center, y_next_center, fill='red', width=3)
 
     def draw_best_path_f(self, canvas):
         for k, (x, y) in enumerate(self.racecar.best_path[1:], start=1):
-            x_center = (y + 1.5) * self.cell_size
-            y_center = (x + 1.5) * self.cell_size
+            x_center, y_center = self.cell_center((x, y))
             canvas.create_oval(x_center - 3, y_center - 3, x_center + 3, y_center + 3, fill='blue')
             canvas.create_text(x_center, y_center, text=str(k), fill='white')
 
             if k < len(self.racecar.best_path) - 1:
-                x_next_center = (self.racecar.best_path[k + 1][1] + 1.5) * self.cell_size
-                y_next_center = (self.racecar.best_path[k + 1][0] + 1.5) * self.cell_size
+                x_next_center, y_next_center = self.cell_center(self.racecar.best_path[k + 1])
                 canvas.create_line(x_center, y_center, x_next_center, y_next_center, fill='blue', width=2)
 
     def draw_last_possible_moves_f(self, canvas):
         for move in self.racecar.calculate_possible_pos(self.racecar.pos, self.racecar.inertia):
             x, y = move
-            x_center = (y + 1.5) * self.cell_size
-            y_center = (x + 1.5) * self.cell_size
+            x_center, y_center = self.cell_center((x, y))
             canvas.create_oval(x_center - 2, y_center - 2, x_center + 2, y_center + 2, fill='yellow')
 
     def draw_race(self):
+        self.set_race_view()
         root = tk.Tk()
         root.title(self.name)
 
-        width = (len(self.track.grid[0]) + 1) * self.cell_size
-        height = (len(self.track.grid) + 1) * self.cell_size
+        width = (self.view_cols + 1) * self.cell_size
+        height = (self.view_rows + 1) * self.cell_size
 
         canvas = tk.Canvas(root, width=width, height=height)
         canvas.pack()
@@ -129,11 +154,12 @@ class Race:
         root.mainloop()
 
     def draw_multiple_paths(self, paths):
+        self.set_view(paths)
         root = tk.Tk()
         root.title(f"{self.name} - Multiple Paths")
 
-        width = (len(self.track.grid[0]) + 1) * self.cell_size
-        height = (len(self.track.grid) + 1) * self.cell_size
+        width = (self.view_cols + 1) * self.cell_size
+        height = (self.view_rows + 1) * self.cell_size
 
         canvas = tk.Canvas(root, width=width, height=height)
         canvas.pack()
@@ -152,14 +178,12 @@ class Race:
             color = colors(idx)[:3]  # Extract RGB components
             color = "#{:02x}{:02x}{:02x}".format(int(color[0]*255), int(color[1]*255), int(color[2]*255))  # Convert to hexadecimal
             for k, (x, y) in enumerate(translated_path):
-                x_center = (y + 1.5) * self.cell_size
-                y_center = (x + 1.5) * self.cell_size
+                x_center, y_center = self.cell_center((x, y))
                 canvas.create_oval(x_center - 3, y_center - 3, x_center + 3, y_center + 3, fill=color)
                 canvas.create_text(x_center, y_center, text=str(k), fill='white')
 
                 if k < len(translated_path) - 1:
-                    x_next_center = (translated_path[k + 1][1] + 1.5) * self.cell_size
-                    y_next_center = (translated_path[k + 1][0] + 1.5) * self.cell_size
+                    x_next_center, y_next_center = self.cell_center(translated_path[k + 1])
                     canvas.create_line(x_center, y_center, x_next_center, y_next_center, fill=color, width=2)
 
         root.mainloop()
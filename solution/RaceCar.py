@@ -1,10 +1,14 @@
 import numpy as np
 import math
+import heapq
 from collections import deque
 from bresenham import bresenham
+from Collision import Collision
 
 class RaceCar:
-    def __init__(self, track, max_depth=5, strategy='fos', max_speed=7, always_moving=1, speed_importance=5):
+    max_beam_width = 256  # widest beam find_next_pos_beam retries with before following a dying line
+
+    def __init__(self, track, max_depth=5, strategy='fos', max_speed=7, always_moving=1, speed_importance=5, use_cost_to_go=0, exact_collision=1, beam_width=None):
         self.track = track
         self.start_pos = self.find_letter_indices('S')
         self.end_pos = self.find_letter_indices('F')
@@ -18,13 +22,21 @@ class RaceCar:
         self.speed_importance = speed_importance # = k for logistic_function
         self.always_moving = always_moving
         self.best_path = [self.start_pos[0]]
+        self.beam_width = beam_width  # keep only this many paths per depth instead of the full BFS
+        self.collision = Collision(track) if exact_collision else None  # segment test of visualise.pl, raytrace if None
+        self.use_cost_to_go = use_cost_to_go
+        if self.use_cost_to_go:
+            self.cost_to_go = self.track.calculate_cost_to_go(self)
 
     def complete_moves(self):
         while self.pos not in self.end_pos:
             self.make_move()
 
     def make_move(self):
-        new_pos = self.find_next_pos(self.pos, self.inertia)
+        if self.beam_width:
+            new_pos = self.find_next_pos_beam(self.pos, self.inertia)
+        else:
+            new_pos = self.find_next_pos(self.pos, self.inertia)
         print(f"{len(self.pos_hist)} {new_pos}")
         self.inertia = (new_pos[0] - self.pos[0], new_pos[1] - self.pos[1])
         print(f"max inertia: {self.max_inertia(self.inertia)}")
@@ -80,9 +92,8 @@ class RaceCar:
             else:
                 possible_positions = self.calculate_possible_pos(current_pos, current_inertia)
                 current_eval = self.evaluate_pos(current_pos, current_inertia)
-                for next_pos in possible_positions:
-                    if (self.is_valid_path(current_pos, next_pos) and
-                    self.evaluate_pos(next_pos, (next_pos[0] - current_pos[0], next_pos[1] - current_pos[1])) < current_eval):
+                for next_pos in self.valid_moves(current_pos, possible_positions):
+                    if self.evaluate_pos(next_pos, (next_pos[0] - current_pos[0], next_pos[1] - current_pos[1])) < current_eval:
                         next_inertia = (next_pos[0] - current_pos[0], next_pos[1] - current_pos[1])
                         next_path = current_path + [next_pos]
                         queue.append((next_path, next_inertia, depth + 1))
@@ -91,11 +102,101 @@ class RaceCar:
         self.best_path = best_path
         return best_path[1] if best_path and len(best_path) > 1 else None
 
+    # Beam search variant of find_next_pos: per depth only the beam_width children with the lowest
+    # evaluate_pos survive, so memory stays bounded by beam_width * max_depth nodes. Nodes are
+    # (pos, inertia, parent) chains instead of copied path lists. Only lines reaching max_depth or
+    # the finish are ranked; if every line dies earlier, the search is repeated with a beam four
+    # times as wide, up to max_beam_width, and then the car follows the deepest line.
+    def find_next_pos_beam(self, start_pos, start_inertia, beam_width=None):
+        beam_width = beam_width or self.beam_width
+        frontier = [(start_pos, start_inertia, None)]
+        best_key = None
+        best_node = None
+        deepest_node = None
+        counter = 0
+
+        for depth in range(1, self.max_depth + 1):
+            beam = []  # max-heap on evaluation, holding at most beam_width nodes
+            seen = set()  # paths meeting in the same state would only crowd out the others
+            for node in frontier:
+                current_pos, current_inertia, _ = node
+                current_eval = self.evaluate_pos(current_pos, current_inertia)
+                for next_pos in self.valid_moves(current_pos, self.calculate_possible_pos(current_pos, current_inertia)):
+                    next_inertia = (next_pos[0] - current_pos[0], next_pos[1] - current_pos[1])
+                    next_eval = self.evaluate_pos(next_pos, next_inertia)
+                    if next_eval >= current_eval or (next_pos, next_inertia) in seen or self.in_chain(next_pos, node):
+                        continue
+                    seen.add((next_pos, next_inertia))
+                    counter += 1
+                    item = (-next_eval, counter, (next_pos, next_inertia, node))
+                    if len(beam) < beam_width:
+                        heapq.heappush(beam, item)
+                    elif item > beam[0]:
+                        heapq.heapreplace(beam, item)
+
+            frontier = []
+            survivors = []
+            for item in beam:
+                node = item[2]
+                pos, inertia, _ = node
+                if depth == self.max_depth or self.track.grid[pos[0]][pos[1]] == 'F':
+                    # Same ranking as find_next_pos: evaluation, depth, first move, speed
+                    first_pos = self.chain_to_path(node)[1]
+                    first_inertia = (first_pos[0] - start_pos[0], first_pos[1] - start_pos[1])
+                    key = (self.evaluate_pos(pos, inertia), depth, self.evaluate_pos(first_pos, first_inertia), -self.max_inertia(inertia))
+                    if best_key is None or key < best_key:
+                        best_key = key
+                        best_node = node
+                else:
+                    frontier.append(node)
+                    survivors.append(item)
+            if survivors:
+                deepest_node = max(survivors)[2]
+
+        if best_node is None:
+            if deepest_node is None:
+                self.best_path = None
+                return None
+            if 4 * beam_width <= self.max_beam_width:
+                return self.find_next_pos_beam(start_pos, start_inertia, 4 * beam_width)
+            # Lowest evaluation among the lines that got furthest
+            best_node = deepest_node
+
+        self.best_path = self.chain_to_path(best_node)
+        return self.best_path[1]
+
+    def in_chain(self, pos, node):
+        while node is not None:
+            if node[0] == pos:
+                return True
+            node = node[2]
+        return False
+
+    def chain_to_path(self, node):
+        path = []
+        while node is not None:
+            path.append(node[0])
+            node = node[2]
+        return path[::-1]
+
     def is_valid_position(self, pos):
         return 0 <= pos[0] < len(self.track.grid) and 0 <= pos[1] < len(self.track.grid[0]) and self.track.grid[pos[0]][pos[1]] != 'O'
 
+    # Filters the positions reachable from pos, checking all segments in one call with exact collision
+    def valid_moves(self, pos, possible_positions):
+        if self.collision is None:
+            return [next_pos for next_pos in possible_positions if self.is_valid_path(pos, next_pos)]
+        candidates = [next_pos for next_pos in possible_positions if self.is_valid_move(pos, next_pos)]
+        collide = self.collision.segments_collide([pos] * len(candidates), candidates)
+        return [next_pos for next_pos, hit in zip(candidates, collide) if not hit]
+
+    def is_valid_move(self, start_pos, end_pos):
+        return self.is_valid_position(start_pos) and self.is_valid_position(end_pos) and (abs(start_pos[0] - end_pos[0]) < self.max_speed + 1) and (abs(start_pos[1] - end_pos[1]) < self.max_speed + 1)
+
     def is_valid_path(self, start_pos, end_pos):
-        if self.is_valid_position(start_pos) and self.is_valid_position(end_pos) and (abs(start_pos[0] - end_pos[0]) < self.max_speed + 1) and (abs(start_pos[1] - end_pos[1]) < self.max_speed + 1):
+        if self.collision is not None:
+            return self.is_valid_move(start_pos, end_pos) and not self.collision.segments_collide([start_pos], [end_pos])[0]
+        if self.is_valid_move(start_pos, end_pos):
             pos_inbetween = list(set(self.raytrace(start_pos, end_pos) + self.raytrace(end_pos, start_pos)))
             # print(f"start_pos: {start_pos}")
             # print(f"end_pos: {end_pos}")
@@ -141,8 +242,10 @@ class RaceCar:
                 possible_pos.append((pos[0] + inertia[0] + direction[0], pos[1] + inertia[1] + direction[1]))
         elif self.track.grid[pos[0]][pos[1]] == 'G':
             if inertia in self.track.directions:
+                # visualise.pl keeps the inertia on grass too, the raytrace rule starts from pos
+                start = (pos[0] + inertia[0], pos[1] + inertia[1]) if self.collision is not None else pos
                 for direction in self.track.directions:
-                    possible_pos.append((pos[0] + direction[0], pos[1] + direction[1]))
+                    possible_pos.append((start[0] + direction[0], start[1] + direction[1]))
             else:
                 slow_inertia = self.slow_inertia(inertia)
                 possible_pos.append((pos[0] + slow_inertia[0], pos[1] + slow_inertia[1]))
@@ -155,27 +258,27 @@ class RaceCar:
         slow_inertia = tuple(x + 1 if x < -1 else x - 1 if x > 1 else x for x in inertia)
         return slow_inertia
 
+    def distance_to_finish(self, pos, inertia):
+        if self.use_cost_to_go:
+            return self.cost_to_go.get((pos, inertia), np.inf)
+        return self.track.distances[pos[0]][pos[1]]
+
     def find_letter_indices(self, letter):
-        indices = []
-        for i, row in enumerate(self.track.grid):
-            for j, cell in enumerate(row):
-                if cell == letter:
-                    indices.append((i, j))
-        return indices
+        return self.track.find_letter_indices(letter)
 
     def evaluate_pos(self, pos, inertia):
         if self.strategy == 'f':
             if self.is_valid_position(pos):
-                return self.track.distances[pos[0]][pos[1]]
+                return self.distance_to_finish(pos, inertia)
             else:
                 return np.inf
         elif self.strategy == 'fo':
             if self.is_valid_position(pos):
-                return self.track.distances[pos[0]][pos[1]] + self.track.distances_to_object[pos[0]][pos[1]]
+                return self.distance_to_finish(pos, inertia) + self.track.distances_to_object[pos[0]][pos[1]]
             else:
                 return np.inf
         else:
-            return self.track.distances[pos[0]][pos[1]] + self.track.distances_to_object[pos[0]][pos[1]] - self.logistic_function(self.max_inertia(inertia))
+            return self.distance_to_finish(pos, inertia) + self.track.distances_to_object[pos[0]][pos[1]] - self.logistic_function(self.max_inertia(inertia))
 
     def logistic_function(self, x):
         return 1 / (1 + np.exp(-self.speed_importance * (x - (self.max_speed / 2))))
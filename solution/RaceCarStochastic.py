@@ -3,10 +3,10 @@ import math
 import random
 from collections import deque
 from bresenham import bresenham
+from Collision import Collision
 
 class RaceCarStochastic:
-
-    def __init__(self, track, max_depth=1, strategy='fo', max_speed=7, always_moving=1, speed_importance=5, seed=42, random_cost=0, backtrack=0):
+    def __init__(self, track, max_depth=1, strategy='fo', max_speed=7, always_moving=1, speed_importance=5, seed=42, random_cost=0, backtrack=0, use_cost_to_go=0, exact_collision=1):
         self.track = track
         self.start_pos = self.find_letter_indices('S')
         self.end_pos = self.find_letter_indices('F')
@@ -20,6 +20,10 @@ class RaceCarStochastic:
         self.speed_importance = speed_importance # = k for logistic_function
         self.always_moving = always_moving
         self.best_path = [self.start_pos[0]]
+        self.collision = Collision(track) if exact_collision else None  # segment test of visualise.pl, raytrace if None
+        self.use_cost_to_go = use_cost_to_go
+        if self.use_cost_to_go:
+            self.cost_to_go = self.track.calculate_cost_to_go(self)
         self.random_cost = random_cost
         self.random_weights = [0.8, 0.1, 0.05, 0.03, 0.02]
         self.backtrack = backtrack
@@ -118,9 +122,8 @@ class RaceCarStochastic:
             else:
                 possible_positions = self.calculate_possible_pos(current_pos, current_inertia)
                 current_eval = self.evaluate_pos(current_pos, current_inertia)
-                for next_pos in possible_positions:
-                    if (self.is_valid_path(current_pos, next_pos) and
-                    self.evaluate_pos(next_pos, (next_pos[0] - current_pos[0], next_pos[1] - current_pos[1])) < current_eval):
+                for next_pos in self.valid_moves(current_pos, possible_positions):
+                    if self.evaluate_pos(next_pos, (next_pos[0] - current_pos[0], next_pos[1] - current_pos[1])) < current_eval:
                         next_inertia = (next_pos[0] - current_pos[0], next_pos[1] - current_pos[1])
                         next_path = current_path + [next_pos]
                         queue.append((next_path, next_inertia, depth + 1))
@@ -132,8 +135,21 @@ class RaceCarStochastic:
     def is_valid_position(self, pos):
         return 0 <= pos[0] < len(self.track.grid) and 0 <= pos[1] < len(self.track.grid[0]) and self.track.grid[pos[0]][pos[1]] != 'O'
 
+    # Filters the positions reachable from pos, checking all segments in one call with exact collision
+    def valid_moves(self, pos, possible_positions):
+        if self.collision is None:
+            return [next_pos for next_pos in possible_positions if self.is_valid_path(pos, next_pos)]
+        candidates = [next_pos for next_pos in possible_positions if self.is_valid_move(pos, next_pos)]
+        collide = self.collision.segments_collide([pos] * len(candidates), candidates)
+        return [next_pos for next_pos, hit in zip(candidates, collide) if not hit]
+
+    def is_valid_move(self, start_pos, end_pos):
+        return self.is_valid_position(start_pos) and self.is_valid_position(end_pos) and (abs(start_pos[0] - end_pos[0]) < self.max_speed + 1) and (abs(start_pos[1] - end_pos[1]) < self.max_speed + 1)
+
     def is_valid_path(self, start_pos, end_pos):
-        if self.is_valid_position(start_pos) and self.is_valid_position(end_pos) and (abs(start_pos[0] - end_pos[0]) < self.max_speed + 1) and (abs(start_pos[1] - end_pos[1]) < self.max_speed + 1):
+        if self.collision is not None:
+            return self.is_valid_move(start_pos, end_pos) and not self.collision.segments_collide([start_pos], [end_pos])[0]
+        if self.is_valid_move(start_pos, end_pos):
             pos_inbetween = list(set(self.raytrace(start_pos, end_pos) + self.raytrace(end_pos, start_pos)))
             # print(f"start_pos: {start_pos}")
             # print(f"end_pos: {end_pos}")
@@ -179,8 +195,10 @@ class RaceCarStochastic:
                 possible_pos.append((pos[0] + inertia[0] + direction[0], pos[1] + inertia[1] + direction[1]))
         elif self.track.grid[pos[0]][pos[1]] == 'G':
             if inertia in self.track.directions:
+                # visualise.pl keeps the inertia on grass too, the raytrace rule starts from pos
+                start = (pos[0] + inertia[0], pos[1] + inertia[1]) if self.collision is not None else pos
                 for direction in self.track.directions:
-                    possible_pos.append((pos[0] + direction[0], pos[1] + direction[1]))
+                    possible_pos.append((start[0] + direction[0], start[1] + direction[1]))
             else:
                 slow_inertia = self.slow_inertia(inertia)
                 possible_pos.append((pos[0] + slow_inertia[0], pos[1] + slow_inertia[1]))
@@ -196,8 +214,10 @@ class RaceCarStochastic:
                 possible_pos.append((pos[0] + inertia[0] + direction[0], pos[1] + inertia[1] + direction[1]))
         elif self.track.grid[pos[0]][pos[1]] == 'G':
             if inertia in self.track.directions:
+                # visualise.pl keeps the inertia on grass too, the raytrace rule starts from pos
+                start = (pos[0] + inertia[0], pos[1] + inertia[1]) if self.collision is not None else pos
                 for direction in self.track.directions:
-                    possible_pos.append((pos[0] + direction[0], pos[1] + direction[1]))
+                    possible_pos.append((start[0] + direction[0], start[1] + direction[1]))
             else:
                 slow_inertia = self.slow_inertia(inertia)
                 possible_pos.append((pos[0] + slow_inertia[0], pos[1] + slow_inertia[1]))
@@ -208,22 +228,22 @@ class RaceCarStochastic:
         slow_inertia = tuple(x + 1 if x < -1 else x - 1 if x > 1 else x for x in inertia)
         return slow_inertia
 
+    def distance_to_finish(self, pos, inertia):
+        if self.use_cost_to_go:
+            return self.cost_to_go.get((pos, inertia), np.inf)
+        return self.track.distances[pos[0]][pos[1]]
+
     def find_letter_indices(self, letter):
-        indices = []
-        for i, row in enumerate(self.track.grid):
-            for j, cell in enumerate(row):
-                if cell == letter:
-                    indices.append((i, j))
-        return indices
+        return self.track.find_letter_indices(letter)
 
     def evaluate_pos(self, pos, inertia):
         if self.strategy == 'f':
             if self.is_valid_position(pos):
                 if self.random_cost:
                     delta = random.choices([0, 1, 2, 3, 4], weights=self.random_weights)[0]
-                    cost = k.distances[pos[0]][pos[1]] + delta
+                    cost = self.distance_to_finish(pos, inertia) + delta
                 else:
-                    cost = k.distances[pos[0]][pos[1]]
+                    cost = self.distance_to_finish(pos, inertia)
                 return cost
             else:
                 return np.inf
@@ -231,18 +251,18 @@ class RaceCarStochastic:
             if self.is_valid_position(pos):
                 if self.random_cost:
                     delta = random.choices([0, 1, 2, 3, 4], weights=self.random_weights)[0]
-                    cost = self.track.distances[pos[0]][pos[1]] + self.track.distances_to_object[pos[0]][pos[1]] + delta
+                    cost = self.distance_to_finish(pos, inertia) + self.track.distances_to_object[pos[0]][pos[1]] + delta
                 else:
-                    cost = self.track.distances[pos[0]][pos[1]] + self.track.distances_to_object[pos[0]][pos[1]]
+                    cost = self.distance_to_finish(pos, inertia) + self.track.distances_to_object[pos[0]][pos[1]]
                 return cost
             else:
                 return np.inf
         else:
             if self.random_cost:
                 delta = random.choices([0, 1, 2, 3, 4], weights=self.random_weights)[0]
-                cost = self.track.distances[pos[0]][pos[1]] + self.track.distances_to_object[pos[0]][pos[1]] - self.logistic_function(self.max_inertia(inertia)) + delta
+                cost = self.distance_to_finish(pos, inertia) + self.track.distances_to_object[pos[0]][pos[1]] - self.logistic_function(self.max_inertia(inertia)) + delta
             else:
-                cost = self.track.distances[pos[0]][pos[1]] + self.track.distances_to_object[pos[0]][pos[1]] - self.logistic_function(self.max_inertia(inertia))
+                cost = self.distance_to_finish(pos, inertia) + self.track.distances_to_object[pos[0]][pos[1]] - self.logistic_function(self.max_inertia(inertia))
             return cost
 
     def logistic_function(self, x):
@@ -0,0 +1,259 @@
+import numpy as np
+from collections import deque
+import math
+import heapq
+
+class SparseTrack:
+    directions = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+    # Drop-in replacement for Track on very large maps. The .t file is streamed line by line and
+    # only tiles containing passable cells are kept. Both distance fields are computed on demand,
+    # so memory grows with the area the car explores instead of the map area. The cost-to-go
+    # table of Track lists every reachable state of the map, so use_cost_to_go is not supported.
+    def __init__(self, file_path, tile_size=64, object_horizon=10):
+        self.tile_size = tile_size
+        self.object_horizon = object_horizon
+        self.tiles = {}
+        self.letter_indices = {'S': [], 'F': []}
+        self.longest_track = 0
+        self.load_track(file_path)
+        self.recommended_max_speed = math.floor(math.sqrt(self.longest_track))
+        self.grid = LazyField(self.cell, self.rows, self.cols)
+        self.distances = LazyField(self.distance_to_finish, self.rows, self.cols)
+        self.distances_to_object = LazyField(self.distance_to_object, self.rows, self.cols)
+
+        # Distances to the finish found so far, and distances to objects per tile
+        self.known_distances = {pos: 0 for pos in self.letter_indices['F']}
+        self.lower_bounds = {}
+        finish = np.array(self.letter_indices['F']).reshape(-1, 2)
+        self.finish_box = (finish[:, 0].min(), finish[:, 0].max(), finish[:, 1].min(), finish[:, 1].max()) if len(finish) else (0, -1, 0, -1)
+        self.object_tiles = {}
+
+    # Streams track file, keeping one band of tile_size rows in memory at a time
+    def load_track(self, file_path):
+        self.rows, self.cols = 0, 0
+        band = []
+
+        with open(file_path, 'r') as file:
+            for line in file:
+                row = np.frombuffer(line.strip().encode(), dtype=np.uint8)
+                if self.rows == 0:
+                    self.cols = len(row)
+                    col_run = np.zeros(self.cols, dtype=np.int64)
+                    diag_run = np.zeros(self.cols, dtype=np.int64)
+                    anti_run = np.zeros(self.cols, dtype=np.int64)
+                row = np.pad(row[:self.cols], (0, self.cols - len(row[:self.cols])), constant_values=ord('O'))
+
+                for letter in self.letter_indices:
+                    self.letter_indices[letter].extend((self.rows, int(c)) for c in np.flatnonzero(row == ord(letter)))
+
+                # Longest consecutive 'T' run in rows, columns and both diagonals
+                is_track = row == ord('T')
+                edges = np.flatnonzero(np.diff(np.concatenate(([0], is_track.astype(np.int8), [0]))))
+                if len(edges):
+                    self.longest_track = max(self.longest_track, int(np.max(edges[1::2] - edges[::2])))
+                col_run = (col_run + 1) * is_track
+                diag_run = (np.concatenate(([0], diag_run[:-1])) + 1) * is_track
+                anti_run = (np.concatenate((anti_run[1:], [0])) + 1) * is_track
+                self.longest_track = max(self.longest_track, int(col_run.max()), int(diag_run.max()), int(anti_run.max()))
+
+                band.append(row)
+                self.rows += 1
+                if len(band) == self.tile_size:
+                    self.store_band(band, self.rows // self.tile_size - 1)
+                    band = []
+
+        if band:
+            self.store_band(band, self.rows // self.tile_size)
+
+    def store_band(self, band, tile_row):
+        block = np.full((self.tile_size, self.cols), ord('O'), dtype=np.uint8)
+        block[:len(band)] = np.array(band)
+        for tile_col in range(math.ceil(self.cols / self.tile_size)):
+            tile = block[:, tile_col * self.tile_size:(tile_col + 1) * self.tile_size]
+            if np.any(tile != ord('O')):
+                padded = np.full((self.tile_size, self.tile_size), ord('O'), dtype=np.uint8)
+                padded[:, :tile.shape[1]] = tile
+                self.tiles[(tile_row, tile_col)] = padded
+
+    def cell(self, r, c):
+        if not (0 <= r < self.rows and 0 <= c < self.cols):
+            return 'O'
+        tile = self.tiles.get((r // self.tile_size, c // self.tile_size))
+        if tile is None:
+            return 'O'
+        return chr(tile[r % self.tile_size, c % self.tile_size])
+
+    # Returns the cells in [r0, r1) x [c0, c1) as uint8 array, cells outside the track are ' '
+    def window(self, r0, r1, c0, c1):
+        window = np.full((r1 - r0, c1 - c0), ord(' '), dtype=np.uint8)
+        window[max(0, -r0):min(r1, self.rows) - r0, max(0, -c0):min(c1, self.cols) - c0] = ord('O')
+        for tile_row in range(max(0, r0) // self.tile_size, (min(r1, self.rows) - 1) // self.tile_size + 1):
+            for tile_col in range(max(0, c0) // self.tile_size, (min(c1, self.cols) - 1) // self.tile_size + 1):
+                tile = self.tiles.get((tile_row, tile_col))
+                if tile is None:
+                    continue
+                top, left = tile_row * self.tile_size, tile_col * self.tile_size
+                wr0, wr1 = max(r0, top), min(r1, top + self.tile_size, self.rows)
+                wc0, wc1 = max(c0, left), min(c1, left + self.tile_size, self.cols)
+                window[wr0 - r0:wr1 - r0, wc0 - c0:wc1 - c0] = tile[wr0 - top:wr1 - top, wc0 - left:wc1 - left]
+        return window
+
+    # Letters of the cells at the given row and column index arrays, looked up tile by tile
+    def cells(self, rows, cols):
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        letters = np.full(rows.shape, ord('O'), dtype=np.uint8)
+        tile_cols = math.ceil(self.cols / self.tile_size)
+        keys = (rows // self.tile_size) * tile_cols + cols // self.tile_size
+        order = np.argsort(keys, kind='stable')
+        for group in np.split(order, np.flatnonzero(np.diff(keys[order])) + 1):
+            if len(group) == 0:
+                continue
+            tile = self.tiles.get(divmod(int(keys[group[0]]), tile_cols))
+            if tile is not None:
+                letters[group] = tile[rows[group] % self.tile_size, cols[group] % self.tile_size]
+        return letters.astype(np.uint32).view('<U1')
+
+    def find_letter_indices(self, letter):
+        return list(self.letter_indices[letter])
+
+    def calculate_cost_to_go(self, racecar):
+        raise NotImplementedError("SparseTrack has no cost-to-go table, its size grows with the map area. Use Track for use_cost_to_go.")
+
+    # Distance to the finish with the rules of Track.calculate_distances, found by A* from the
+    # looked up cell instead of a BFS over the whole map. Cells whose distance is known act as
+    # extra goals, and every cell on the path found gets its exact distance cached, so searches
+    # stay in the region between the car and the cells it already knows.
+    def distance_to_finish(self, r, c):
+        if not self.is_valid_position((r, c)):
+            return float('inf')
+        if (r, c) not in self.known_distances:
+            self.search_distance((r, c))
+        return self.known_distances[(r, c)]
+
+    def search_distance(self, start):
+        g = {start: 0}
+        parent = {start: None}
+        heap = [(self.finish_heuristic(start), 0, start)]
+        best_goal, best_cost = None, float('inf')
+
+        while heap:
+            f, negative_g, current_pos = heapq.heappop(heap)
+            current_distance = -negative_g
+            if f >= best_cost:
+                break
+            if current_distance > g[current_pos]:
+                continue
+
+            known = self.known_distances.get(current_pos)
+            if known is not None:
+                if current_distance + known < best_cost:
+                    best_goal, best_cost = current_pos, current_distance + known
+                continue
+
+            for direction in SparseTrack.directions:
+                if direction in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
+                    if self.cell(current_pos[0] + direction[0], current_pos[1]) == 'O' or self.cell(current_pos[0], current_pos[1] + direction[1]) == 'O':
+                        continue
+
+                new_pos = (current_pos[0] + direction[0], current_pos[1] + direction[1])
+                new_distance = current_distance + 1
+
+                if self.is_valid_position(new_pos) and new_distance < g.get(new_pos, float('inf')):
+                    g[new_pos] = new_distance
+                    parent[new_pos] = current_pos
+                    heapq.heappush(heap, (new_distance + self.finish_heuristic(new_pos), -new_distance, new_pos))
+
+        # d(start) <= g(pos) + d(pos), so every cell reached gets a lower bound for later searches
+        if best_goal is not None:
+            for pos, distance in g.items():
+                if best_cost - distance > self.lower_bounds.get(pos, 0):
+                    self.lower_bounds[pos] = best_cost - distance
+
+        if best_goal is None:
+            # No finish reachable from any cell searched
+            for pos in g:
+                self.known_distances[pos] = float('inf')
+            return
+
+        pos = parent[best_goal]
+        while pos is not None:
+            self.known_distances[pos] = best_cost - g[pos]
+            pos = parent[pos]
+
+    # Lower bound of the distance to the finish: Chebyshev distance to the bounding box of the
+    # finish, or a bound left by an earlier search
+    def finish_heuristic(self, pos):
+        row_gap = max(self.finish_box[0] - pos[0], 0, pos[0] - self.finish_box[1])
+        col_gap = max(self.finish_box[2] - pos[1], 0, pos[1] - self.finish_box[3])
+        return max(row_gap, col_gap, self.lower_bounds.get(pos, 0))
+
+    # Distance to the nearest object 'O', rescaled between 0 and 0.99 like Track. Computed for a
+    # whole tile at once; distances beyond object_horizon are clipped, which replaces the global
+    # maximum Track uses for rescaling.
+    def distance_to_object(self, r, c):
+        key = (r // self.tile_size, c // self.tile_size)
+        if key not in self.object_tiles:
+            self.object_tiles[key] = self.calculate_distances_to_object(*key)
+        return float(self.object_tiles[key][r % self.tile_size, c % self.tile_size])
+
+    def calculate_distances_to_object(self, tile_row, tile_col):
+        horizon = self.object_horizon
+        top, left = tile_row * self.tile_size, tile_col * self.tile_size
+        window = self.window(top - horizon, top + self.tile_size + horizon, left - horizon, left + self.tile_size + horizon)
+
+        reached = window == ord('O')
+        distance = np.where(reached, 0, horizon).astype(float)
+        for d in range(1, horizon):
+            grown = reached.copy()
+            grown[1:, :] |= reached[:-1, :]
+            grown[:-1, :] |= reached[1:, :]
+            grown[:, 1:] |= grown[:, :-1].copy()
+            grown[:, :-1] |= grown[:, 1:].copy()
+            distance[grown & ~reached] = d
+            reached = grown
+
+        distance = distance[horizon:-horizon, horizon:-horizon]
+        is_object = window[horizon:-horizon, horizon:-horizon] == ord('O')
+        return np.where(is_object, 0, np.clip(0.99 - (distance - 1) / (horizon - 1) * 0.99, 0, 0.99))
+
+    def is_valid_position(self, pos):
+        r, c = pos
+        return 0 <= r < self.rows and 0 <= c < self.cols and self.cell(r, c) != 'O'
+
+
+# Row-indexable view so cars can keep using track.grid[r][c] and track.distances[r][c]. Indices
+# behave like on the NumPy grid of Track: negative ones count from the end, others past the
+# border raise IndexError.
+class LazyField:
+    def __init__(self, value, rows, cols):
+        self.value = value
+        self.rows = rows
+        self.cols = cols
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, r):
+        return LazyRow(self.value, check_index(r, self.rows), self.cols)
+
+
+class LazyRow:
+    def __init__(self, value, r, length):
+        self.value = value
+        self.r = r
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, c):
+        return self.value(self.r, check_index(c, self.length))
+
+
+def check_index(index, length):
+    if index < 0:
+        index += length
+    if not 0 <= index < length:
+        raise IndexError(f"index {index} is out of bounds for size {length}")
+    return index
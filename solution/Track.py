@@ -11,6 +11,7 @@ class Track:
         self.distances_to_object = self.calculate_distances_to_object(self.grid)
         self.longest_track = self.longest_consecutive_tracks(self.grid)
         self.recommended_max_speed = math.floor(math.sqrt(self.longest_track))
+        self.cost_to_go = {}  # (max_speed, always_moving, exact_collision) -> {(pos, inertia): moves to finish}
 
     # Loads track file
     def load_track(self, file_path):
@@ -139,6 +140,53 @@ class Track:
 
         return distance
 
+    # Calculates the number of moves to the finish of every (position, inertia) state reachable
+    # from the start. States are enumerated with the move rules of the given car, then a BFS runs
+    # backwards from the finish. Tables are cached per car setting and shared between cars.
+    def calculate_cost_to_go(self, racecar):
+        key = (racecar.max_speed, racecar.always_moving, racecar.collision is not None)
+        if key in self.cost_to_go:
+            return self.cost_to_go[key]
+
+        start_states = [(pos, (0, 0)) for pos in racecar.start_pos]
+        visited = set(start_states)
+        predecessors = {}
+        finish_states = []
+        queue = deque(start_states)
+
+        while queue:
+            state = queue.popleft()
+            pos, inertia = state
+            if self.grid[pos[0]][pos[1]] == 'F':
+                finish_states.append(state)
+                continue
+            for next_pos in racecar.valid_moves(pos, racecar.calculate_possible_pos(pos, inertia)):
+                next_state = (next_pos, (next_pos[0] - pos[0], next_pos[1] - pos[1]))
+                predecessors.setdefault(next_state, []).append(state)
+                if next_state not in visited:
+                    visited.add(next_state)
+                    queue.append(next_state)
+
+        cost_to_go = {state: 0 for state in finish_states}
+        queue = deque(finish_states)
+
+        while queue:
+            state = queue.popleft()
+            for previous_state in predecessors.get(state, []):
+                if previous_state not in cost_to_go:
+                    cost_to_go[previous_state] = cost_to_go[state] + 1
+                    queue.append(previous_state)
+
+        self.cost_to_go[key] = cost_to_go
+        return cost_to_go
+
+    # Letters of the cells at the given row and column index arrays
+    def cells(self, rows, cols):
+        return self.grid[rows, cols]
+
+    def find_letter_indices(self, letter):
+        return [(int(r), int(c)) for r, c in np.argwhere(self.grid == letter)]
+
     def print_distances(self):
         for row in self.distances:
             print(' '.join(f'{cell:4}' for cell in row))
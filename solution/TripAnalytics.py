@@ -0,0 +1,123 @@
+import numpy as np
+from Collision import Collision
+from TripFile import load_trip
+
+class TripAnalytics:
+    # Statistics over a batch of trips on one track. All trips are stored in one ragged array:
+    # positions holds the (row, col) of every trip back to back, trip i is
+    # positions[offsets[i]:offsets[i + 1]].
+    def __init__(self, track, trips):
+        self.track = track
+        self.rows, self.cols = len(track.grid), len(track.grid[0])
+        self.lengths = np.array([len(trip) for trip in trips], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+        self.positions = (np.concatenate([np.asarray(trip, dtype=np.int64).reshape(-1, 2) for trip in trips])
+                          if self.offsets[-1] else np.zeros((0, 2), dtype=np.int64))
+        self.trip_index = np.repeat(np.arange(len(trips)), self.lengths)
+
+        # Step k of a trip is the move from position k to position k + 1
+        is_step = np.ones(len(self.positions), dtype=bool)
+        is_step[self.offsets[1:][self.lengths > 0] - 1] = False
+        self.step_trip = self.trip_index[is_step]
+        self.step_index = (np.arange(len(self.positions)) - self.offsets[self.trip_index])[is_step]
+        self.steps = self.positions[1:][is_step[:-1]] - self.positions[:-1][is_step[:-1]] if len(self.positions) else self.positions
+
+    # Loads trips in the .rl format, e.g. saved by Race.save_trip
+    @classmethod
+    def from_files(cls, track, file_paths):
+        return cls(track, [load_trip(file_path, len(track.grid)) for file_path in file_paths])
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def moves(self):
+        return np.maximum(self.lengths - 1, 0)
+
+    # Number of trips per number of moves, empty trips are left out
+    def length_distribution(self):
+        return np.bincount(self.moves()[self.lengths > 0])
+
+    # Cell of the last position of every trip, 'O' for empty trips and positions off the track
+    def last_cells(self):
+        cells = np.full(len(self), 'O')
+        ends = np.flatnonzero(self.lengths > 0)
+        last = self.positions[self.offsets[ends + 1] - 1]
+        on_track = (last[:, 0] >= 0) & (last[:, 0] < self.rows) & (last[:, 1] >= 0) & (last[:, 1] < self.cols)
+        cells[ends[on_track]] = self.track.cells(last[on_track, 0], last[on_track, 1])
+        return cells
+
+    # A trip finished if its last position is on the finish, otherwise the car crashed
+    def finished(self):
+        return self.last_cells() == 'F'
+
+    def crash_rate(self):
+        return 1 - self.finished().mean() if len(self) else 0.0
+
+    # Trips passing every check of visualise.pl, see Collision.validate_trips
+    def valid(self):
+        trips = [self.positions[start:end] for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+        return np.array([len(wrong) == 0 for wrong in Collision(self.track).validate_trips(trips)], dtype=bool)
+
+    # Steps where the new position is at most one cell away from position + inertia
+    def valid_steps(self):
+        if len(self.steps) == 0:
+            return np.zeros(0, dtype=bool)
+        inertia = np.zeros_like(self.steps)
+        follows = np.concatenate(([False], self.step_trip[1:] == self.step_trip[:-1]))
+        inertia[follows] = self.steps[:-1][follows[1:]]
+        return np.all(np.abs(self.steps - inertia) <= 1, axis=1)
+
+    # Speed (largest inertia component) of every step
+    def speeds(self):
+        return np.max(np.abs(self.steps), axis=1)
+
+    # Mean and maximum speed at each step index over all trips
+    def speed_profile(self):
+        speeds = self.speeds()
+        counts = np.bincount(self.step_index)
+        mean = np.bincount(self.step_index, weights=speeds) / np.maximum(counts, 1)
+        maximum = np.zeros(len(counts), dtype=np.int64)
+        np.maximum.at(maximum, self.step_index, speeds)
+        return mean, maximum
+
+    # Number of times each cell of the track grid was visited
+    def heatmap(self, selection=None):
+        positions = self.positions if selection is None else self.positions[np.isin(self.trip_index, self.select(selection))]
+        rows, cols = self.rows, self.cols
+        positions = positions[(positions[:, 0] >= 0) & (positions[:, 0] < rows) & (positions[:, 1] >= 0) & (positions[:, 1] < cols)]
+        flat = positions[:, 0] * cols + positions[:, 1]
+        return np.bincount(flat, minlength=rows * cols).reshape(rows, cols)
+
+    # Index of the finished trip with the fewest moves, None if no trip finished
+    def best_trip(self):
+        candidates = np.flatnonzero(self.finished())
+        if len(candidates) == 0:
+            return None
+        return int(candidates[np.argmin(self.moves()[candidates])])
+
+    # Indices of the trips within the length bounds, optionally only finished and unique ones
+    def filter(self, min_moves=0, max_moves=np.inf, finished_only=0, unique=0):
+        keep = (self.moves() >= min_moves) & (self.moves() <= max_moves)
+        if finished_only:
+            keep &= self.finished()
+        if unique:
+            is_first = np.zeros(len(self), dtype=bool)
+            is_first[self.unique()] = True
+            keep &= is_first
+        return np.flatnonzero(keep)
+
+    # Index of the first occurrence of every distinct trip, trips are compared by their raw bytes
+    def unique(self):
+        first = {}
+        for i, (start, end) in enumerate(zip(self.offsets[:-1], self.offsets[1:])):
+            first.setdefault(self.positions[start:end].tobytes(), i)
+        return np.fromiter(first.values(), dtype=np.int64, count=len(first))
+
+    def select(self, selection):
+        selection = np.asarray(selection)
+        return np.flatnonzero(selection) if selection.dtype == bool else selection
+
+    # Trips as lists of (row, col) tuples, e.g. for Race.draw_multiple_paths
+    def paths(self, selection=None):
+        indices = np.arange(len(self)) if selection is None else self.select(selection)
+        return [[(int(r), int(c)) for r, c in self.positions[self.offsets[i]:self.offsets[i + 1]]] for i in indices]
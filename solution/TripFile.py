@@ -0,0 +1,15 @@
+import numpy as np
+
+# Reading and writing trips in the .rl format of visualise.pl: one "x, y" line per position, where
+# x is the column and y counts rows from the bottom. Kept apart from Race so batch jobs can load
+# trips without tkinter and matplotlib.
+
+def save_trip(filename, positions, num_rows):
+    with open(filename, 'w') as file:
+        for r, c in positions:
+            file.write(f"{c}, {num_rows - 1 - r}\n")
+
+# Reads a trip written by save_trip back into (row, col) positions of a track with num_rows rows
+def load_trip(filename, num_rows):
+    trip = np.loadtxt(filename, delimiter=',', dtype=np.int64, ndmin=2)
+    return [(num_rows - 1 - int(y), int(x)) for x, y in trip]